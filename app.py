@@ -1,6 +1,6 @@
 import uuid
 from flask import Flask, render_template, request, send_file, jsonify, Response
-import pandas as pd
+from python_calamine import CalamineWorkbook
 from pptx import Presentation
 from pptx.util import Inches, Pt
 from pptx.enum.text import PP_ALIGN
@@ -8,7 +8,6 @@ import os
 from werkzeug.utils import secure_filename
 import json
 import logging
-import numpy as np
 from datetime import datetime
 import shutil
 from PIL import Image
@@ -21,6 +20,7 @@ from pptx.dml.color import RGBColor
 from docx import Document
 import re
 import csv
+import bisect
 from docx.shared import RGBColor
 from flask import request, jsonify
 from lease_population.block_replacer import get_all_block_previews
@@ -28,6 +28,7 @@ from lease_population.block_replacer import replace_signature_and_notary_blocks
 from docx import Document
 from lease_population.block_replacer import generate_signature_block, generate_notary_block
 from lease_population.block_replacer import getSigBlock, getNotaryBlock, generate_enhanced_combined_block
+from lease_population.block_replacer import load_block_template
 
 # --- Lease Population Module Integration ---
 from lease_population import register_lease_population_routes
@@ -41,6 +42,12 @@ app.config['SEND_FILE_MAX_AGE_DEFAULT'] = 0  # No caching for large files
 
 
 
+def _cell_text(value):
+    """Render a spreadsheet cell as text; whole-number floats lose their trailing '.0'."""
+    if isinstance(value, float) and value.is_integer():
+        value = int(value)
+    return str(value).strip()
+
 def parse_kv_table_file(file_storage):
     """
     Parse a 2-column CSV or Excel file into a list of {'key': ..., 'value': ...} dicts.
@@ -51,20 +58,33 @@ def parse_kv_table_file(file_storage):
     document_name = None
     if filename.endswith('.csv'):
         file_storage.stream.seek(0)
-        reader = csv.reader((line.decode('utf-8') for line in file_storage.stream), delimiter=',')
-        rows = list(reader)
-        if rows:
-            document_name = rows[0][0].strip() if rows[0] and rows[0][0] else 'lease_population_filled'
-            for row in rows[1:]:
-                if len(row) >= 2:
-                    mapping.append({'key': row[0].strip(), 'value': row[1].strip()})
-    elif filename.endswith('.xlsx') or filename.endswith('.xls'):
-        df = pd.read_excel(file_storage, header=None)
-        if not df.empty:
-            document_name = str(df.iloc[0,0]).strip() if not pd.isnull(df.iloc[0,0]) else 'lease_population_filled'
-            for _, row in df.iloc[1:].iterrows():
-                if len(row) >= 2:
-                    mapping.append({'key': str(row[0]).strip(), 'value': str(row[1]).strip()})
+        # Decode in buffered chunks and stream rows straight from the reader
+        text_stream = io.TextIOWrapper(file_storage.stream, encoding='utf-8', newline='')
+        try:
+            reader = csv.reader(text_stream, delimiter=',')
+            first = next(reader, None)
+            if first is not None:
+                document_name = first[0].strip() if first and first[0] else 'lease_population_filled'
+                for row in reader:
+                    if len(row) >= 2:
+                        mapping.append({'key': row[0].strip(), 'value': row[1].strip()})
+        finally:
+            # Hand the upload stream back open instead of closing it with the wrapper
+            text_stream.detach()
+    elif filename.endswith(('.xlsx', '.xls')):
+        # calamine parses both formats natively and yields plain cell values, no DataFrame
+        file_storage.stream.seek(0)
+        workbook = CalamineWorkbook.from_filelike(file_storage.stream)
+        try:
+            rows = workbook.get_sheet_by_index(0).iter_rows()
+            first = next(rows, None)
+            if first is not None:
+                document_name = _cell_text(first[0]) if first and first[0] != '' else 'lease_population_filled'
+                for row in rows:
+                    if len(row) >= 2 and row[0] != '':
+                        mapping.append({'key': _cell_text(row[0]), 'value': _cell_text(row[1])})
+        finally:
+            workbook.close()
     else:
         raise ValueError('Unsupported file type')
     # Remove header row if it looks like a header (after document name row)
@@ -83,10 +103,13 @@ def parse_kv_table():
     file = request.files['table_file']
     try:
         mapping, document_name = parse_kv_table_file(file)
-        # Validate
-        keys = [pair['key'] for pair in mapping]
-        if any(not k for k in keys) or len(set(keys)) != len(keys):
-            return jsonify({'error': 'Keys must be non-empty and unique'}), 400
+        # Validate in one pass, stopping at the first empty or repeated key
+        seen = set()
+        for pair in mapping:
+            key = pair['key']
+            if not key or key in seen:
+                return jsonify({'error': 'Keys must be non-empty and unique'}), 400
+            seen.add(key)
         return jsonify({'mapping': mapping, 'document_name': document_name})
     except Exception as e:
         return jsonify({'error': str(e)}), 400
@@ -105,6 +128,18 @@ def add_comment_to_run(run, comment_text):
     # If/when support is added, this is where to insert a real comment.
 
 
+def _remove_paragraph_elements(elements):
+    """Unlink the given <w:p> elements, collected up front, from the document."""
+    for el in elements:
+        el.getparent().remove(el)
+
+# Whole-paragraph header matches, ignoring case and surrounding whitespace, without
+# allocating a stripped/lower-cased copy of every paragraph's text
+_ACK_HEADER_RE = re.compile(
+    r'\s*(?:(?P<entity>acknowledgment block for entity or trust)|(?P<individual>acknowledgment block for individual))\s*',
+    re.IGNORECASE)
+_SIG_HEADER_RE = re.compile(r'\s*\[trust/entity name\]\s*', re.IGNORECASE)
+
 def remove_acknowledgment_block(doc, keep_type):
     """
     Remove the acknowledgment block for the non-selected party type.
@@ -112,26 +147,21 @@ def remove_acknowledgment_block(doc, keep_type):
     - The block to remove starts at its header and includes all following paragraphs up to the next block's header or end of document.
     - If both or neither block is found, insert a placeholder or error message.
     """
-    # Define headers (case-insensitive, strip whitespace)
-    header_entity = 'acknowledgment block for entity or trust'
-    header_individual = 'acknowledgment block for individual'
-    # Determine which to keep/remove
+    # Determine which header group to keep/remove (see _ACK_HEADER_RE)
     if keep_type.lower() == 'entity or trust':
-        header_remove = header_individual
-        header_keep = header_entity
+        header_remove, header_keep = 'individual', 'entity'
     else:
-        header_remove = header_entity
-        header_keep = header_individual
+        header_remove, header_keep = 'entity', 'individual'
     # Find all paragraphs
     paragraphs = doc.paragraphs
-    idx_remove = None
-    idx_keep = None
+    # Last occurrence of each header wins
+    found = {}
     for i, p in enumerate(paragraphs):
-        text = p.text.strip().lower()
-        if text == header_remove:
-            idx_remove = i
-        if text == header_keep:
-            idx_keep = i
+        match = _ACK_HEADER_RE.fullmatch(p.text)
+        if match:
+            found[match.lastgroup] = i
+    idx_remove = found.get(header_remove)
+    idx_keep = found.get(header_keep)
     # If both or neither found, insert error/placeholder
     if idx_remove is None or idx_keep is None or idx_remove == idx_keep:
         doc.add_paragraph('[ERROR: Could not find both acknowledgment blocks for removal. Please check your template.]')
@@ -139,30 +169,40 @@ def remove_acknowledgment_block(doc, keep_type):
     # Determine block to remove: from idx_remove up to (but not including) idx_keep or end
     start = idx_remove
     end = idx_keep if idx_keep > idx_remove else len(paragraphs)
-    for i in range(end-1, start-1, -1):
-        p = paragraphs[i]._element
-        p.getparent().remove(p)
+    _remove_paragraph_elements([paragraphs[i]._element for i in range(start, end)])
     return doc
 
 def remove_entity_signature_block(doc):
     """
     Remove the '[Trust/Entity Name]' signature block and its following lines (By:, Name:, Title:) if present.
     """
-    sig_header = '[trust/entity name]'
     sig_lines = ['by:', 'name:', 'title:']
     paragraphs = doc.paragraphs
-    idx_sig = None
-    for i, p in enumerate(paragraphs):
-        if p.text.strip().lower() == sig_header:
-            idx_sig = i
-            break
+    idx_sig = next((i for i, p in enumerate(paragraphs) if _SIG_HEADER_RE.fullmatch(p.text)), None)
     if idx_sig is not None:
         end = min(idx_sig + 4, len(paragraphs))
-        for i in range(end-1, idx_sig-1, -1):
-            p = paragraphs[i]._element
-            p.getparent().remove(p)
+        _remove_paragraph_elements([paragraphs[i]._element for i in range(idx_sig, end)])
     return doc
 
+# (start marker, end marker, label) of the sections removed for each grantee type; markers are lower-case
+_ENFORCED_SECTIONS = {
+    # Individuals: remove the entity sections
+    'individual': (
+        ('[trust/entity name]', 'my commission expires:___', 'Entity Section 1'),
+        ('acknowledgment block for entity or trust', '(signature of notary public)', 'Entity Section 2'),
+    ),
+    # Entities: remove the individual sections
+    'entity': (
+        ('grantor:', 'name:', 'Individual Section 1'),
+        ('acknowledgment block for individual', '(signature of notary public)', 'Individual Section 2'),
+    ),
+}
+# One alternation per grantee type, used to skip paragraphs that contain no marker at all
+_ENFORCED_MARKER_RES = {
+    kind: re.compile('|'.join(re.escape(marker) for section in sections for marker in section[:2]), re.IGNORECASE)
+    for kind, sections in _ENFORCED_SECTIONS.items()
+}
+
 def remove_acknowledgment_blocks_enforced(doc, grantee_type):
     """
     Remove or retain sections based on grantee_type ('Individual' or 'Entity or Trust') using explicit start/end markers.
@@ -178,19 +218,40 @@ def remove_acknowledgment_blocks_enforced(doc, grantee_type):
     If a marker is not found, return a clear error message.
     """
     grantee_type = grantee_type.strip().lower()
+    kind = 'individual' if grantee_type == 'individual' else 'entity'
+    sections = _ENFORCED_SECTIONS[kind]
+    marker_re = _ENFORCED_MARKER_RES[kind]
     paragraphs = doc.paragraphs
+    # Scan raw text case-insensitively; only paragraphs containing a marker are normalized,
+    # and each is recorded under every marker it contains
+    occurrences = {marker: [] for section in sections for marker in section[:2]}
+    for i, p in enumerate(paragraphs):
+        text = p.text
+        if marker_re.search(text):
+            text = text.strip().lower()
+            for marker, found in occurrences.items():
+                if marker in text:
+                    found.append(i)
     def find_section_indices(start_marker, end_marker, section_label):
         indices = []
         start = None
         start_idx = None
-        for i, p in enumerate(paragraphs):
-            text = p.text.strip().lower()
-            if start is None and start_marker.strip().lower() in text:
-                start = i
-                start_idx = i
-            elif start is not None and end_marker.strip().lower() in text:
-                indices.append((start, i))
-                start = None
+        starts = occurrences[start_marker]
+        ends = occurrences[end_marker]
+        # Two-pointer walk: the next start after the last section end, then the first end after it
+        # (a paragraph holding both markers opens a section but never closes its own)
+        pos = -1
+        while True:
+            k = bisect.bisect_right(starts, pos)
+            if k == len(starts):
+                break
+            start = start_idx = starts[k]
+            k = bisect.bisect_right(ends, start)
+            if k == len(ends):
+                break
+            pos = ends[k]
+            indices.append((start, pos))
+            start = None
         if start is not None:
             context = '\n'.join(f'{j}: {paragraphs[j].text}' for j in range(max(0, start_idx-2), min(len(paragraphs), start_idx+5)))
             raise Exception(f"Could not find END marker '{end_marker}' for section '{section_label}'.\nContext:\n{context}")
@@ -199,22 +260,11 @@ def remove_acknowledgment_blocks_enforced(doc, grantee_type):
             raise Exception(f"Could not find START marker '{start_marker}' for section '{section_label}'.\nParagraphs:\n{context}")
         return indices
     to_remove = []
-    if grantee_type == 'individual':
-        # Remove entity sections
-        entity1 = find_section_indices('[trust/entity name]', 'my commission expires:___', 'Entity Section 1')
-        entity2 = find_section_indices('acknowledgment block for entity or trust', '(signature of notary public)', 'Entity Section 2')
-        to_remove.extend(entity1)
-        to_remove.extend(entity2)
-    else:
-        # Remove individual sections
-        ind1 = find_section_indices('grantor:', 'name:', 'Individual Section 1')
-        ind2 = find_section_indices('acknowledgment block for individual', '(signature of notary public)', 'Individual Section 2')
-        to_remove.extend(ind1)
-        to_remove.extend(ind2)
-    for start, end in sorted(to_remove, reverse=True):
-        for i in range(end, start-1, -1):
-            p = paragraphs[i]._element
-            p.getparent().remove(p)
+    for start_marker, end_marker, section_label in sections:
+        to_remove.extend(find_section_indices(start_marker, end_marker, section_label))
+    # Collect elements up front; overlapping sections must not remove a paragraph twice
+    remove_idx = sorted({i for start, end in to_remove for i in range(start, end + 1)})
+    _remove_paragraph_elements([paragraphs[i]._element for i in remove_idx])
     return doc
 
 # --- Lease Population Placeholder Replacement: Robust Party Type Logic ---
@@ -290,19 +340,15 @@ def get_dynamic_block_preview():
 
     data = request.get_json()
     party_type = (data.get('party_type') or '').strip().lower()
-    import os
-    base = os.path.join('templates', 'blocks')
     if party_type == 'individual':
-        sig_file = os.path.join(base, 'individual_signature.txt')
-        notary_file = os.path.join(base, 'individual_notary.txt')
+        sig_file = 'individual_signature.txt'
+        notary_file = 'individual_notary.txt'
     else:
-        sig_file = os.path.join(base, 'entity_signature.txt')
-        notary_file = os.path.join(base, 'entity_notary.txt')
+        sig_file = 'entity_signature.txt'
+        notary_file = 'entity_notary.txt'
     try:
-        with open(sig_file, 'r') as f:
-            sig_block = f.read()
-        with open(notary_file, 'r') as f:
-            notary_block = f.read()
+        sig_block = load_block_template(sig_file)
+        notary_block = load_block_template(notary_file)
         return jsonify({'signature_block': sig_block, 'notary_block': notary_block})
     except Exception as e:
         return jsonify({'error': f'Could not load template: {str(e)}'}), 400
@@ -338,9 +384,7 @@ def generate_signature_block():
         return jsonify({'success': True, 'content': result})
         
     except Exception as e:
-        print(f"[ERROR] Error generating signature block: {str(e)}")
-        import traceback
-        traceback.print_exc()
+        app.logger.exception("Error generating signature block")
         return jsonify({'success': False, 'error': str(e)}), 500
 
 @app.route('/get_signature_block', methods=['POST'])
@@ -392,9 +436,7 @@ def gen_exhibit_a():
                 'parcel_count': len(parcels)
             })
         except Exception as e:
-            print(f"[ERROR] Failed to generate exhibit string: {str(e)}")
-            import traceback
-            traceback.print_exc()
+            app.logger.exception("Failed to generate exhibit string")
             return jsonify({'error': f'Failed to generate exhibit string: {str(e)}'}), 500
         
     except Exception as e:
@@ -432,7 +474,7 @@ def test_image_embedding():
             import tempfile
             import os
             with tempfile.NamedTemporaryFile(delete=False, suffix='.docx') as tmp_file:
-                doc.save(tmp_file.name)
+                doc.save(tmp_file)
                 tmp_file_path = tmp_file.name
             
             # Return success with file path
@@ -556,4 +598,7 @@ register_lease_population_routes(app)
 if __name__ == '__main__':
     import os
     port = int(os.environ.get('PORT', 5001))
-    app.run(debug=True, port=port) 
\ No newline at end of file
+    # Development server only; the debugger and reloader are opt-in via FLASK_DEBUG=1.
+    # Production should run under gunicorn instead (see gunicorn.conf.py).
+    debug = os.environ.get('FLASK_DEBUG', '').lower() in ('1', 'true')
+    app.run(debug=debug, port=port) 
\ No newline at end of file
@@ -0,0 +1,24 @@
+"""
+Gunicorn configuration for serving the app in production:
+
+    gunicorn app:app
+
+Document generation is CPU-bound (XML traversal and zip writing), so each
+request gets its own sync worker process rather than sharing one interpreter.
+"""
+
+import multiprocessing
+import os
+
+bind = f"0.0.0.0:{os.environ.get('PORT', 5001)}"
+
+# One process per core; the GIL makes threads no help for CPU-bound requests
+workers = int(os.environ.get('WEB_CONCURRENCY', multiprocessing.cpu_count()))
+worker_class = 'sync'
+
+# Large leases with embedded images can take a while to build
+timeout = 120
+
+# Import the app (python-docx, lxml, calamine, compiled module-level patterns) once
+# in the master and fork it into workers copy-on-write
+preload_app = True
@@ -1,6 +1,8 @@
 # block_replacer.py
 
 import os
+import functools
+import logging
 from docx import Document
 from docx.shared import Inches
 from docx.enum.text import WD_ALIGN_PARAGRAPH
@@ -8,11 +10,22 @@ from PIL import Image
 import io
 import base64
 
-def load_block_template(filename):
-    path = os.path.join('templates', 'blocks', filename)
-    with open(path, 'r') as f:
+logger = logging.getLogger(__name__)
+
+@functools.lru_cache(maxsize=64)
+def _read_template_cached(path, mtime_ns, encoding):
+    with open(path, 'r', encoding=encoding) as f:
         return f.read()
 
+def read_template_file(*parts, encoding=None):
+    """Read a file under templates/, reusing the cached text until its mtime changes"""
+    path = os.path.join('templates', *parts)
+    # A stat is much cheaper than open/read/decode; raises FileNotFoundError like open() would
+    return _read_template_cached(path, os.stat(path).st_mtime_ns, encoding)
+
+def load_block_template(filename):
+    return read_template_file('blocks', filename)
+
 def embedImage(doc: Document, image_data: str, placeholder: str = '[EXHIBIT_A_IMAGE_1]'):
     """
     Embed an image into a DOCX document at the location of a placeholder.
@@ -26,35 +39,35 @@ def embedImage(doc: Document, image_data: str, placeholder: str = '[EXHIBIT_A_IM
         bool: True if image was successfully embedded, False otherwise
     """
     try:
-        print(f"[DEBUG] Starting image embedding for placeholder: {placeholder}")
+        logger.debug("Starting image embedding for placeholder: %s", placeholder)
         
         # Validate input
         if not image_data or not isinstance(image_data, str):
-            print("[ERROR] Invalid image data: must be non-empty string")
+            logger.error("Invalid image data: must be non-empty string")
             return False
         
         # Decode base64 image data
         try:
             image_bytes = base64.b64decode(image_data)
-            print(f"[DEBUG] Decoded base64 image data, size: {len(image_bytes)} bytes")
+            logger.debug("Decoded base64 image data, size: %d bytes", len(image_bytes))
         except Exception as e:
-            print(f"[ERROR] Failed to decode base64 image data: {str(e)}")
+            logger.error("Failed to decode base64 image data: %s", e)
             return False
         
         # Validate minimum size
         if len(image_bytes) < 8:
-            print("[ERROR] Image data too small to be valid")
+            logger.error("Image data too small to be valid")
             return False
         
         # Validate PNG header
         if not image_bytes.startswith(b'\x89PNG\r\n\x1a\n'):
-            print("[ERROR] Invalid PNG header")
+            logger.error("Invalid PNG header")
             return False
         
         # Open and validate image with Pillow
         try:
             image = Image.open(io.BytesIO(image_bytes))
-            print(f"[DEBUG] Opened image: format={image.format}, size={image.size}, mode={image.mode}")
+            logger.debug("Opened image: format=%s, size=%s, mode=%s", image.format, image.size, image.mode)
             
             # Convert to RGB if necessary (for PNG with transparency)
             if image.mode in ('RGBA', 'LA', 'P'):
@@ -64,14 +77,15 @@ def embedImage(doc: Document, image_data: str, placeholder: str = '[EXHIBIT_A_IM
                     image = image.convert('RGBA')
                 background.paste(image, mask=image.split()[-1] if image.mode == 'RGBA' else None)
                 image = background
-                print("[DEBUG] Converted transparent image to RGB with white background")
+                logger.debug("Converted transparent image to RGB with white background")
             elif image.mode != 'RGB':
                 image = image.convert('RGB')
-                print(f"[DEBUG] Converted image from {image.mode} to RGB")
+                logger.debug("Converted image from %s to RGB", image.mode)
         except Exception as e:
-            print(f"[ERROR] Failed to process image with Pillow: {str(e)}")
-            print(f"[DEBUG] Image bytes size: {len(image_bytes)}")
-            print(f"[DEBUG] First 100 bytes: {image_bytes[:100]}")
+            logger.error("Failed to process image with Pillow: %s", e)
+            if logger.isEnabledFor(logging.DEBUG):
+                logger.debug("Image bytes size: %d", len(image_bytes))
+                logger.debug("First 100 bytes: %r", image_bytes[:100])
             return False
         
         # Resize image to reasonable dimensions (max width 6 inches)
@@ -84,13 +98,13 @@ def embedImage(doc: Document, image_data: str, placeholder: str = '[EXHIBIT_A_IM
             new_width = max_width_pixels
             new_height = int(image.height * ratio)
             image = image.resize((new_width, new_height), Image.Resampling.LANCZOS)
-            print(f"[DEBUG] Resized image from {original_size} to {image.size}")
+            logger.debug("Resized image from %s to %s", original_size, image.size)
         
         # Convert back to bytes
         img_byte_arr = io.BytesIO()
         image.save(img_byte_arr, format='PNG', optimize=True)
         img_byte_arr = img_byte_arr.getvalue()
-        print(f"[DEBUG] Converted image to PNG format, size: {len(img_byte_arr)} bytes")
+        logger.debug("Converted image to PNG format, size: %d bytes", len(img_byte_arr))
         
         # Find and replace placeholder in document
         found_placeholder = False
@@ -100,7 +114,7 @@ def embedImage(doc: Document, image_data: str, placeholder: str = '[EXHIBIT_A_IM
             nonlocal found_placeholder, placeholder_count
             if placeholder in paragraph.text:
                 placeholder_count += 1
-                print(f"[DEBUG] Found placeholder '{placeholder}' in paragraph #{placeholder_count}")
+                logger.debug("Found placeholder '%s' in paragraph #%d", placeholder, placeholder_count)
                 
                 # Clear the paragraph and add centered image
                 paragraph.clear()
@@ -113,7 +127,7 @@ def embedImage(doc: Document, image_data: str, placeholder: str = '[EXHIBIT_A_IM
                 run.add_picture(io.BytesIO(img_byte_arr), width=Inches(width_inches))
                 paragraph.alignment = WD_ALIGN_PARAGRAPH.CENTER
                 found_placeholder = True
-                print(f"[DEBUG] Successfully embedded image in paragraph #{placeholder_count}")
+                logger.debug("Successfully embedded image in paragraph #%d", placeholder_count)
         
         def process_table(table):
             for row in table.rows:
@@ -146,17 +160,16 @@ def embedImage(doc: Document, image_data: str, placeholder: str = '[EXHIBIT_A_IM
                     process_paragraph(paragraph)
         
         if not found_placeholder:
-            print(f"[WARNING] Placeholder '{placeholder}' not found in document")
-            print(f"[DEBUG] Document has {len(doc.paragraphs)} paragraphs")
+            logger.warning("Placeholder '%s' not found in document", placeholder)
+            if logger.isEnabledFor(logging.DEBUG):
+                logger.debug("Document has %d paragraphs", len(doc.paragraphs))
             return False
         
-        print(f"[DEBUG] Image embedding completed successfully. Found {placeholder_count} placeholder(s)")
+        logger.debug("Image embedding completed successfully. Found %d placeholder(s)", placeholder_count)
         return True
         
-    except Exception as e:
-        print(f"[ERROR] Critical error in image embedding: {str(e)}")
-        import traceback
-        traceback.print_exc()
+    except Exception:
+        logger.exception("Critical error in image embedding")
         return False
 
 def generate_signature_block(grantor_name, trust_entity_name=None, name=None, title=None, block_type='individual', state=None, county=None, name_of_individuals=None, type_of_authority=None, instrument_for=None):
@@ -183,9 +196,7 @@ def generate_enhanced_signature_block(owner_type, grantor_name=None, trust_entit
     template_file = template_mapping.get(owner_type, 'individual_signature_enhanced.txt')
     
     try:
-        template_path = os.path.join('templates', 'sigBlocks', template_file)
-        with open(template_path, 'r', encoding='utf-8') as f:
-            template = f.read()
+        template = read_template_file('sigBlocks', template_file, encoding='utf-8')
     except FileNotFoundError:
         # Fallback to basic template
         if owner_type == 'individual':
@@ -390,7 +401,7 @@ def build_exhibit_string(parcels):
         str: The complete Exhibit A text string
     """
     try:
-        print(f"[DEBUG] Building exhibit string for {len(parcels)} parcels")
+        logger.debug("Building exhibit string for %d parcels", len(parcels))
         
         # Validate parcels data
         if not isinstance(parcels, list) or len(parcels) == 0:
@@ -406,7 +417,7 @@ def build_exhibit_string(parcels):
         # Add parcel descriptions
         for i, parcel in enumerate(parcels, 1):
             if not isinstance(parcel, dict) or "parcelNumber" not in parcel:
-                print(f"[WARNING] Invalid parcel data at index {i}: {parcel}")
+                logger.warning("Invalid parcel data at index %d: %r", i, parcel)
                 continue
             
             parcel_number = parcel.get("parcelNumber", i)
@@ -418,20 +429,18 @@ def build_exhibit_string(parcels):
             else:
                 parcel_description = f"Parcel {parcel_number}:\n\nA parcel of the property described as follows: [Legal description for parcel {parcel_number}]"
             
-            print(f"[DEBUG] Parcel {parcel_number}: {{\"Portion\" if is_portion else \"Parcel\"}} (isPortion: {is_portion})")
+            logger.debug("Parcel %s: %s (isPortion: %s)", parcel_number, "Portion" if is_portion else "Parcel", is_portion)
             exhibit_parts.append(parcel_description)
             exhibit_parts.append("")  # Add spacing between parcels
         
         # Join all parts
         exhibit_string = "\n".join(exhibit_parts)
         
-        print(f"[DEBUG] Generated exhibit string, length: {len(exhibit_string)}")
+        logger.debug("Generated exhibit string, length: %d", len(exhibit_string))
         return exhibit_string
         
-    except Exception as e:
-        print(f"[ERROR] Failed to build exhibit string: {str(e)}")
-        import traceback
-        traceback.print_exc()
+    except Exception:
+        logger.exception("Failed to build exhibit string")
         raise
 
 # need to develop if condition to to stylstic 
@@ -453,74 +462,50 @@ Printed Name: ____________________
 
 My Commission Expires: ___________"""
 
+# Owner types whose signature files depend on an exact signature count
+_SIG_BLOCK_FILES = {
+    ('his/her sole property', 1): ('SI1.txt', None),
+    ('a married couple', 2): ('I1.txt', 'I1.txt'),
+    ('Sole Owner, married couple', 2): ('I1.txt', 'SI1.txt'),
+}
+
 def getSigBlock(ownerType: str, numSignatures: int):
     # Store the values for future use
     owner_type = ownerType
     num_signatures = numSignatures
-    filename1 = None
-    filename2 = None
     filename1Content = None
     filename2Content = None
     # Map owner types to template files (using files that actually exist)
-    if owner_type == 'his/her sole property' and num_signatures == 1:
-        filename1 = 'SI1.txt'
-    elif owner_type == 'a married couple' and num_signatures == 2:
-        filename1 = 'I1.txt'
-        filename2 = 'I1.txt'
-    elif owner_type == 'Corporation':
-        filename1 = 'E1.txt'
-        if num_signatures == 2:
-            filename2 = 'E1.txt'
-    elif owner_type == 'LLC':
-        filename1 = 'E1.txt'
-        if num_signatures == 2:
-            filename2 = 'E1.txt'
-    elif owner_type == 'LP':    
-        filename1 = 'E1.txt'
-        if num_signatures == 2:
-            filename2 = 'E1.txt'
-    elif owner_type == 'Trust':
-        filename1 = 'E1.txt'
-        if num_signatures == 2:
-            filename2 = 'E1.txt'
-    elif owner_type == 'Sole Owner, married couple' and num_signatures == 2:
-        filename1 = 'I1.txt'
-        filename2 = 'SI1.txt'
-    elif 'individual' in owner_type.lower():
-        # Default individual case
-        filename1 = 'I1.txt'
+    filename1, filename2 = _SIG_BLOCK_FILES.get((owner_type, num_signatures), (None, None))
+    if filename1 is None:
+        # Entity types (Corporation, LLC, LP, Trust) and unknown types use E1; individuals use I1
+        filename1 = 'I1.txt' if 'individual' in owner_type.lower() else 'E1.txt'
         if num_signatures == 2:
-            filename2 = 'I1.txt'
-    else:
-        # Default entity case
-        filename1 = 'E1.txt'
-        if num_signatures == 2:
-            filename2 = 'E1.txt'
+            filename2 = filename1
     import os
     
     # Load content from filename1 if it exists
     if filename1:
         path1 = os.path.join('templates', 'sigBlocks', filename1)
-        if os.path.exists(path1):
-            with open(path1, 'r') as f:
-                filename1Content = f.read().strip()
-                print(f"[DEBUG] Loaded filename1 ({filename1}): {len(filename1Content)} characters")
-        else:
+        try:
+            filename1Content = read_template_file('sigBlocks', filename1).strip()
+            logger.debug("Loaded filename1 (%s): %d characters", filename1, len(filename1Content))
+        except FileNotFoundError:
             filename1Content = f"Template file '{filename1}' not found at {path1}"
-            print(f"[ERROR] {filename1Content}")
+            logger.error("%s", filename1Content)
     
     # Load content from filename2 if it exists  
     if filename2:
         path2 = os.path.join('templates', 'sigBlocks', filename2)
-        if os.path.exists(path2):
-            with open(path2, 'r') as f:
-                filename2Content = f.read().strip()
-                print(f"[DEBUG] Loaded filename2 ({filename2}): {len(filename2Content)} characters")
-        else:
+        try:
+            filename2Content = read_template_file('sigBlocks', filename2).strip()
+            logger.debug("Loaded filename2 (%s): %d characters", filename2, len(filename2Content))
+        except FileNotFoundError:
             filename2Content = f"Template file '{filename2}' not found at {path2}"
-            print(f"[ERROR] {filename2Content}")
+            logger.error("%s", filename2Content)
     
-    print(f"[DEBUG] getSigBlock returning: filename1Content={filename1Content is not None}, filename2Content={filename2Content is not None}")
+    logger.debug("getSigBlock returning: filename1Content=%s, filename2Content=%s",
+                 filename1Content is not None, filename2Content is not None)
     
     # Return array with filename1 and filename2 content
     return [filename1Content, filename2Content]
@@ -530,13 +515,8 @@ def getSigBlock(ownerType: str, numSignatures: int):
 # need to fix this function 
 def notrary_generator():
     # Read notrary.txt file content
-    import os
-    notrary_file_path = os.path.join('templates', 'Notorary', 'notrary.txt')
-    
     try:
-        with open(notrary_file_path, 'r') as f:
-            notrary_content = f.read()
-        return notrary_content
+        return read_template_file('Notorary', 'notrary.txt')
     except FileNotFoundError:
         return f"Notary block template file 'notrary.txt' not found."
     except Exception as e:
@@ -559,32 +539,32 @@ def generator(ownerType, is_notary, notary_block, num_signatures):
     sigB1 = filecontent[0] if filecontent[0] is not None else ''
     sigB2 = filecontent[1] if filecontent[1] is not None else ''
     
-    final_string = ""
+    # Collect the blocks and join once at the end instead of growing a string
+    parts = []
 
-    # Edge case where there are unique sig blocks 
+    # Edge case where there are unique sig blocks
     if owner_type == 'Sole owner, married couple' and is_notary:
-        final_string += sigB1
+        parts.append(sigB1)
         if is_notary and notary_content:
-            final_string += "\n\n" + notary_content
-        final_string += "\n\n" + sigB2
+            parts.append(notary_content)
+        parts.append(sigB2)
         if is_notary and notary_content:
-            final_string += "\n\n" + notary_content
+            parts.append(notary_content)
 
-        return final_string
+        return "\n\n".join(parts)
     if owner_type == 'Sole owner, married couple' and not is_notary:
-        final_string += sigB1
-        final_string += "\n\n" + sigB2
-        return final_string
-    
+        parts.append(sigB1)
+        parts.append(sigB2)
+        return "\n\n".join(parts)
+
     # Generate additional signature blocks based on num_signatures
     for i in range(num_signatures):
+        parts.append(sigB1)
         if is_notary and notary_content:
-            final_string += "\n\n" + sigB1
-            final_string += "\n\n" + notary_content
-        else:
-            final_string += "\n\n" + sigB1
+            parts.append(notary_content)
 
-    return final_string 
+    # Every block in the repeated layout is preceded by a blank line
+    return "".join("\n\n" + part for part in parts) 
 
 
 
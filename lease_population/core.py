@@ -8,17 +8,203 @@ Need to break down the image embedding process into smaller steps.
 """
 
 import json
+import re
+import bisect
+import itertools
 import base64
 from io import BytesIO
+import logging
 from docx import Document
 from docx.shared import Inches
 from docx.enum.text import WD_ALIGN_PARAGRAPH
 from docx.shared import Pt
+from docx.text.paragraph import Paragraph
+from docx.oxml.ns import qn
+from lxml import etree
 from flask import jsonify, send_file
 from .utils import normalize_placeholder_key, strip_brackets
 from .image_handler import ImageEmbeddingHandler
 from .block_replacer import embedImage, generate_signature_block, generate_notary_block
 
+logger = logging.getLogger(__name__)
+
+# All text under an element in one C-level call; a superset of the paragraph's run text
+_paragraph_xml_text = etree.XPath('string(.)')
+
+_W_T = qn('w:t')
+_W_RPR = qn('w:rPr')
+_XML_SPACE = '{http://www.w3.org/XML/1998/namespace}space'
+# Characters python-docx turns into <w:tab/>/<w:br/>/<w:cr/> elements when setting run.text
+_RUN_SPECIAL_CHARS = re.compile('[\t\n\r\x0b\x0c]')
+
+
+def _compile_mapping(mapping, include_bracketless=True):
+    """
+    Compile a placeholder mapping for single-pass matching
+    
+    Args:
+        mapping: Placeholder to value mapping; blank values are skipped
+        include_bracketless: Also match each placeholder without its brackets
+    
+    Returns:
+        tuple: (lead, prefilter, pattern, replacements), or None if nothing would be replaced
+    """
+    # Resolve every variant (and its bracketless form) to its value once
+    replacements = {}
+    # Only the bracketed keys themselves decide whether a paragraph is touched
+    triggers = set()
+    for key, value in mapping.items():
+        if not value.strip():
+            continue
+        for variant in normalize_placeholder_key(key):
+            replacements.setdefault(variant, value)
+            triggers.add(variant)
+            if not include_bracketless:
+                continue
+            bracketless = strip_brackets(variant)
+            if bracketless != variant:
+                replacements.setdefault(bracketless, value)
+    replacements.pop('', None)
+    triggers.discard('')
+    if not triggers:
+        return None
+    # Longest first so 'Grantor Name' wins over a shorter overlapping 'Grantor'
+    pattern = re.compile('|'.join(
+        re.escape(variant) for variant in sorted(replacements, key=len, reverse=True)))
+    prefilter = re.compile('|'.join(re.escape(variant) for variant in triggers))
+    # A character every trigger starts with lets paragraphs be rejected before their runs are built
+    lead = '[' if all(variant.startswith('[') for variant in triggers) else ''
+    return lead, prefilter, pattern, replacements
+
+
+def _splice_runs(runs, texts, matches):
+    """
+    Write replacements back into only the runs each match touches
+    
+    Args:
+        runs: Paragraph runs in document order
+        texts: Text of each run; joined, this is the string that was matched
+        matches: (start, end, value) spans over the joined text, in order
+    
+    Returns:
+        set: Indices of the runs that received a replacement value
+    """
+    ends = list(itertools.accumulate(len(text) for text in texts))
+    pieces = [[] for _ in texts]
+    touched = set()
+    targets = set()
+    
+    def keep(start, end):
+        # Copy unmatched text in [start, end) back into the runs it came from
+        i = bisect.bisect_right(ends, start)
+        while start < end:
+            run_start = ends[i] - len(texts[i])
+            stop = min(end, ends[i])
+            pieces[i].append(texts[i][start - run_start:stop - run_start])
+            start = stop
+            i += 1
+    
+    pos = 0
+    for start, end, value in matches:
+        keep(pos, start)
+        # The value takes the formatting of the run the placeholder starts in
+        first = bisect.bisect_right(ends, start)
+        last = bisect.bisect_right(ends, end - 1)
+        pieces[first].append(value)
+        targets.add(first)
+        touched.update(range(first, last + 1))
+        pos = end
+    keep(pos, ends[-1])
+    
+    for i in touched:
+        _set_run_text(runs[i], ''.join(pieces[i]))
+    return targets
+
+
+def _set_run_text(run, text):
+    """Set a run's text, writing the <w:t> node directly when the run holds nothing else"""
+    content = [child for child in run._r if child.tag != _W_RPR]
+    if len(content) == 1 and content[0].tag == _W_T and not _RUN_SPECIAL_CHARS.search(text):
+        t = content[0]
+        t.text = text
+        if text != text.strip():
+            t.set(_XML_SPACE, 'preserve')
+        return
+    # Tabs, breaks or other run content: let python-docx rebuild the run
+    run.text = text
+
+
+def _find_matches(joined, pattern, replacements):
+    """Return (start, end, value) for every placeholder in the joined text"""
+    return [(m.start(), m.end(), replacements[m.group(0)]) for m in pattern.finditer(joined)]
+
+
+def _may_contain(paragraph, lead):
+    """Cheap check on the paragraph's raw XML text before any Run objects are created"""
+    return not lead or lead in _paragraph_xml_text(paragraph._p)
+
+
+def _replace_in_paragraph(paragraph, lead, prefilter, pattern, replacements):
+    """Replace compiled placeholders in a single paragraph"""
+    if not _may_contain(paragraph, lead):
+        return
+    runs = paragraph.runs
+    if not runs:
+        return
+    texts = [run.text for run in runs]
+    joined = ''.join(texts)
+    # Single scan for any placeholder; most paragraphs bail out here
+    if prefilter.search(joined):
+        _splice_runs(runs, texts, _find_matches(joined, pattern, replacements))
+
+
+def _highlight_replace_in_paragraph(paragraph, lead, prefilter, pattern, replacements):
+    """Replace placeholders, including ones split across runs, and highlight them"""
+    if not _may_contain(paragraph, lead):
+        return
+    runs = paragraph.runs
+    if not runs:
+        return
+    texts = [run.text for run in runs]
+    matches = _find_matches(''.join(texts), pattern, replacements)
+    if matches:
+        for i in _splice_runs(runs, texts, matches):
+            runs[i].font.highlight_color = 7  # yellow
+
+
+def _iter_table_paragraphs(table):
+    """Yield paragraphs of every cell in a table"""
+    for row in table.rows:
+        for cell in row.cells:
+            yield from _iter_block_paragraphs(cell)
+
+
+def _iter_block_paragraphs(block):
+    """Yield paragraphs of a block, including those inside its tables' cells"""
+    if hasattr(block, 'iter_inner_content'):
+        # python-docx >= 1.0: one walk over the block's children, in document order
+        for item in block.iter_inner_content():
+            if isinstance(item, Paragraph):
+                yield item
+            else:
+                yield from _iter_table_paragraphs(item)
+        return
+    for paragraph in block.paragraphs:
+        yield paragraph
+    for table in getattr(block, 'tables', []):
+        yield from _iter_table_paragraphs(table)
+
+
+def _iter_document_paragraphs(doc):
+    """Yield paragraphs from the body, tables, headers, footers and footnotes"""
+    yield from _iter_block_paragraphs(doc)
+    for section in doc.sections:
+        yield from _iter_block_paragraphs(section.header)
+        yield from _iter_block_paragraphs(section.footer)
+    if hasattr(doc, 'part') and hasattr(doc.part, 'footnotes'):
+        for footnote in doc.part.footnotes.part.footnotes:
+            yield from footnote.paragraphs
+
 
 class LeasePopulationProcessor:
     """
@@ -208,10 +394,8 @@ class LeasePopulationProcessor:
                 else:
                     print(f"Image embedding failed for {placeholder_key}: {result.get('error')}")
                     
-            except Exception as e:
-                print(f"Image embedding error for {placeholder_key}: {str(e)}")
-                import traceback
-                traceback.print_exc()
+            except Exception:
+                logger.exception("Image embedding error for %s", placeholder_key)
         
         return mapping
     
@@ -224,95 +408,25 @@ class LeasePopulationProcessor:
     
     def _replace_placeholders_in_docx(self, doc, mapping):
         """Replace placeholders in DOCX document"""
-        def replace_in_runs(runs, mapping):
-            full_text = ''.join(run.text for run in runs)
-            for key, value in mapping.items():
-                if not value.strip():
-                    continue
-                for variant in normalize_placeholder_key(key):
-                    full_text = full_text.replace(variant, value)
-                    bracketless = strip_brackets(variant)
-                    if bracketless != variant:
-                        full_text = full_text.replace(bracketless, value)
-            if runs:
-                runs[0].text = full_text
-                for run in runs[1:]:
-                    run.text = ''
-        
-        def process_paragraph(paragraph, mapping):
-            if not paragraph.runs:
-                return
-            joined = ''.join(run.text for run in paragraph.runs)
-            if any(variant in joined for key, value in mapping.items() if value.strip() 
-                   for variant in normalize_placeholder_key(key)):
-                replace_in_runs(paragraph.runs, mapping)
-        
-        def process_table(table, mapping):
-            for row in table.rows:
-                for cell in row.cells:
-                    process_block(cell, mapping)
-        
-        def process_block(block, mapping):
-            for paragraph in block.paragraphs:
-                process_paragraph(paragraph, mapping)
-            for table in getattr(block, 'tables', []):
-                process_table(table, mapping)
+        compiled = _compile_mapping(mapping)
+        if compiled is None:
+            return doc
         
         # Process all document sections
-        for paragraph in doc.paragraphs:
-            process_paragraph(paragraph, mapping)
-        for table in doc.tables:
-            process_table(table, mapping)
-        for section in doc.sections:
-            process_block(section.header, mapping)
-            process_block(section.footer, mapping)
-        if hasattr(doc, 'part') and hasattr(doc.part, 'footnotes'):
-            for footnote in doc.part.footnotes.part.footnotes:
-                for paragraph in footnote.paragraphs:
-                    process_paragraph(paragraph, mapping)
+        for paragraph in _iter_document_paragraphs(doc):
+            _replace_in_paragraph(paragraph, *compiled)
         
         return doc
     
     def _replace_placeholders_with_track_changes(self, doc, mapping):
         """Replace placeholders with track changes highlighting"""
-        def process_paragraph(paragraph, mapping):
-            for run in paragraph.runs:
-                for key, value in mapping.items():
-                    if not value.strip():
-                        continue
-                    replaced = False
-                    for variant in normalize_placeholder_key(key):
-                        if variant in run.text:
-                            run.text = run.text.replace(variant, value)
-                            run.font.highlight_color = 7  # yellow
-                            replaced = True
-                            break
-                    if replaced:
-                        break
-        
-        def process_table(table, mapping):
-            for row in table.rows:
-                for cell in row.cells:
-                    process_block(cell, mapping)
-        
-        def process_block(block, mapping):
-            for paragraph in block.paragraphs:
-                process_paragraph(paragraph, mapping)
-            for table in getattr(block, 'tables', []):
-                process_table(table, mapping)
+        compiled = _compile_mapping(mapping, include_bracketless=False)
+        if compiled is None:
+            return doc
         
         # Process all document sections
-        for paragraph in doc.paragraphs:
-            process_paragraph(paragraph, mapping)
-        for table in doc.tables:
-            process_table(table, mapping)
-        for section in doc.sections:
-            process_block(section.header, mapping)
-            process_block(section.footer, mapping)
-        if hasattr(doc, 'part') and hasattr(doc.part, 'footnotes'):
-            for footnote in doc.part.footnotes.part.footnotes:
-                for paragraph in footnote.paragraphs:
-                    process_paragraph(paragraph, mapping)
+        for paragraph in _iter_document_paragraphs(doc):
+            _highlight_replace_in_paragraph(paragraph, *compiled)
         
         return doc
     
@@ -362,32 +476,9 @@ class LeasePopulationProcessor:
                     if '[Notary Block]' in run.text:
                         run.text = run.text.replace('[Notary Block]', notary_block)
             
-            def process_paragraph(paragraph):
-                replace_blocks_in_runs(paragraph.runs)
-            
-            def process_table(table):
-                for row in table.rows:
-                    for cell in row.cells:
-                        process_block(cell)
-            
-            def process_block(block):
-                for paragraph in block.paragraphs:
-                    process_paragraph(paragraph)
-                for table in getattr(block, 'tables', []):
-                    process_table(table)
-            
             # Process all document sections
-            for paragraph in doc.paragraphs:
-                process_paragraph(paragraph)
-            for table in doc.tables:
-                process_table(table)
-            for section in doc.sections:
-                process_block(section.header)
-                process_block(section.footer)
-            if hasattr(doc, 'part') and hasattr(doc.part, 'footnotes'):
-                for footnote in doc.part.footnotes.part.footnotes:
-                    for paragraph in footnote.paragraphs:
-                        process_paragraph(paragraph)
+            for paragraph in _iter_document_paragraphs(doc):
+                replace_blocks_in_runs(paragraph.runs)
             
             return self._generate_final_document(doc, document_name)
             
@@ -16,6 +16,9 @@ import logging
 logging.basicConfig(level=logging.INFO)
 logger = logging.getLogger(__name__)
 
+# Length objects are immutable ints, so one instance can be shared by every paragraph
+IMAGE_SPACE_AFTER = Pt(12)
+
 
 class ImageEmbeddingHandler:
     """Enhanced image embedding with advanced features"""
@@ -256,7 +259,7 @@ class ImageEmbeddingHandler:
                     paragraph.alignment = WD_ALIGN_PARAGRAPH.CENTER
                     
                     # Add spacing after image
-                    paragraph.space_after = Pt(12)
+                    paragraph.space_after = IMAGE_SPACE_AFTER
                     
                     found_placeholder = True
                     logger.info(f"Successfully embedded image in paragraph #{placeholder_count}")
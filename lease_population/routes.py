@@ -164,7 +164,7 @@ def register_lease_population_routes(app):
             import tempfile
             import os
             with tempfile.NamedTemporaryFile(delete=False, suffix='.docx') as tmp_file:
-                doc.save(tmp_file.name)
+                doc.save(tmp_file)
                 output_path = tmp_file.name
             
             return jsonify({
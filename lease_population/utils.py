@@ -2,12 +2,16 @@
 Utility functions for lease population processing
 """
 
+import functools
+import io
+
 
 def normalize_placeholder_key(key):
     """Return only the key as-is for direct matching (no variants)."""
     return [key.strip()]
 
 
+@functools.lru_cache(maxsize=1024)
 def strip_brackets(placeholder):
     """Remove surrounding brackets from a placeholder if present."""
     s = placeholder.strip()
@@ -19,14 +23,19 @@ def strip_brackets(placeholder):
 def parse_kv_table_file(file_storage):
     """Parse key-value table file and return mapping"""
     try:
-        content = file_storage.read().decode('utf-8')
-        lines = content.strip().split('\n')
+        # Decode and split lines incrementally instead of holding the whole upload as one string
+        stream = getattr(file_storage, 'stream', file_storage)
+        text_stream = io.TextIOWrapper(stream, encoding='utf-8', newline='\n')
         mapping = []
         
-        for line in lines:
-            if '=' in line:
-                key, value = line.split('=', 1)
-                mapping.append({'key': key.strip(), 'value': value.strip()})
+        try:
+            for line in text_stream:
+                if '=' in line:
+                    key, value = line.split('=', 1)
+                    mapping.append({'key': key.strip(), 'value': value.strip()})
+        finally:
+            # Leave the upload stream open for the caller
+            text_stream.detach()
         
         return mapping
     except Exception as e: